@@ -10,6 +10,8 @@ class BridgeResponse(BaseModel):
     topic: str
     community: str
     ai_guidance: str
+    cached: bool = False
+    pacing_ms: Optional[int] = None  # Suggested typewriter delay for the client
 
 # This schema will be used for our WebSocket JSON packets
 class StreamPacket(BaseModel):
@@ -3,14 +3,31 @@ from langchain_groq import ChatGroq
 from langchain_community.vectorstores import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.messages import HumanMessage, SystemMessage
+from app.utils.subject_registry import CHROMA_PATH, get_subject_collection
+from app.utils.single_flight import StreamSingleFlight
 
 # Initialize the "Brain"
 embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
 
 # Ensure the directory exists before connecting
-persist_dir = "app/db/chroma_expert"
+persist_dir = CHROMA_PATH
 vector_db = Chroma(persist_directory=persist_dir, embedding_function=embeddings)
 
+# One open handle per subject shard, created on first use
+subject_dbs = {}
+
+def get_subject_db(subject):
+    collection = get_subject_collection(subject)
+    if collection is None:
+        return None
+    if collection not in subject_dbs:
+        subject_dbs[collection] = Chroma(
+            collection_name=collection,
+            persist_directory=persist_dir,
+            embedding_function=embeddings,
+        )
+    return subject_dbs[collection]
+
 llm = ChatGroq(
     temperature=0, 
     model_name="llama-3.1-8b-instant",
@@ -18,10 +35,35 @@ llm = ChatGroq(
     api_key=os.getenv("GROQ_API_KEY") 
 ) 
 
+# Identical questions for the same subject share one retrieval + Groq stream
+expert_flights = StreamSingleFlight()
+
+def _request_key(user_message, subject):
+    # Whitespace only: case matters in maths (P vs p, set A vs element a)
+    return (" ".join(user_message.split()), subject)
+
 async def stream_expert_response(user_message, subject):
+    """
+    Streams the expert answer. When many students send the same homework question
+    at once, only the first one hits retrieval and Groq; the rest get the same chunks
+    (replayed from the start if they join late).
+    """
+    async for chunk in expert_flights.stream(
+        _request_key(user_message, subject),
+        lambda: _generate_expert_response(user_message, subject),
+    ):
+        yield chunk
+
+async def _generate_expert_response(user_message, subject):
     # 1. Search for chunks strictly related to the subject
     # 'k=4' ensures we get enough context for complex Simplex or Logic problems
-    docs = vector_db.similarity_search(user_message, k=4, filter={"subject": subject})
+    subject_db = get_subject_db(subject)
+    if subject_db is not None:
+        # Sharded subject: only this subject's chunks are searched
+        docs = subject_db.similarity_search(user_message, k=4)
+    else:
+        # Not migrated yet: fall back to filtering the shared collection
+        docs = vector_db.similarity_search(user_message, k=4, filter={"subject": subject})
     context = "\n---\n".join([d.page_content for d in docs])
 
     # 2. Your Specific "Strict" System Prompt (Unaltered)
@@ -2,11 +2,20 @@ import os
 import asyncio # 1. Import asyncio
 from dotenv import load_dotenv
 from groq import AsyncGroq
+from app.utils.guidance_cache import get_guidance, save_guidance, record_request, pairs_to_prewarm
 
 load_dotenv()
 client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
 
-async def get_ai_bridging_stream(topic: str, community: str):
+# Typewriter delay we used to apply on the server; cached answers skip it and
+# hand it to the client as a pacing hint instead
+TYPEWRITER_DELAY = 0.05
+
+# Pre-warming job settings
+PREWARM_INTERVAL = int(os.getenv("GUIDANCE_PREWARM_INTERVAL", "600"))  # seconds
+PREWARM_BATCH = int(os.getenv("GUIDANCE_PREWARM_BATCH", "10"))
+
+async def get_ai_bridging_stream(topic: str, community: str, pace: float = TYPEWRITER_DELAY):
     prompt = (
         f"The user is learning about '{topic}'. They live in '{community}'. "
         f"Explain how this topic can solve a local problem in '{community}' "
@@ -28,4 +37,43 @@ async def get_ai_bridging_stream(topic: str, community: str):
             yield content
             # 2. Add a tiny delay (e.g., 0.05s for a typewriter effect)
             # 1 full second is actually very slow for reading!
-            await asyncio.sleep(0.05)
\ No newline at end of file
+            if pace:
+                await asyncio.sleep(pace)
+
+async def generate_bridging_guidance(topic: str, community: str):
+    """Generates the full guidance at full speed and stores it in the cache."""
+    parts = []
+    async for content in get_ai_bridging_stream(topic, community, pace=0):
+        parts.append(content)
+    guidance = "".join(parts)
+    if guidance:
+        # SQLite calls run in a thread so they never block the event loop
+        await asyncio.to_thread(save_guidance, topic, community, guidance)
+    return guidance
+
+async def get_bridging_guidance(topic: str, community: str):
+    """Returns (guidance, cached). Every call counts towards the pre-warming ranking."""
+    await asyncio.to_thread(record_request, topic, community)
+    cached = await asyncio.to_thread(get_guidance, topic, community)
+    if cached is not None:
+        return cached, True
+    return await generate_bridging_guidance(topic, community), False
+
+async def prewarm_guidance_cache(limit: int = PREWARM_BATCH):
+    """Fills (or refreshes) the cache for the most requested topic/community pairs."""
+    warmed = 0
+    for topic, community in await asyncio.to_thread(pairs_to_prewarm, limit):
+        try:
+            await generate_bridging_guidance(topic, community)
+            warmed += 1
+        except Exception as e:
+            print(f"Guidance pre-warm failed for ({topic}, {community}): {e}")
+    return warmed
+
+async def run_prewarm_job(interval: int = PREWARM_INTERVAL):
+    """Background loop started with the app."""
+    while True:
+        warmed = await prewarm_guidance_cache()
+        if warmed:
+            print(f"INFO: Pre-warmed bridging guidance for {warmed} topic/community pair(s).")
+        await asyncio.sleep(interval)
@@ -24,19 +24,24 @@
 #     except Exception as e:
 #         return f"OCR Error: {str(e)}"
 # app/services/ocr_engine.py
-import easyocr
 import numpy as np
 from PIL import Image
 import io
 import os
-import requests
+import time
+import httpx
 import asyncio
+import threading
+import weakref
+from collections import deque
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Initialize local fallback reader
-reader = easyocr.Reader(['en'], gpu=False)
+# Local fallback reader, loaded on first use so importing this module
+# (e.g. from the ingestion scripts) does not pull in the EasyOCR model
+reader = None
+_reader_lock = threading.Lock()
 
 # Hugging Face Config
 HF_TOKEN = os.getenv("HUGGINGFACE_TOKEN")
@@ -44,33 +49,229 @@ HF_TOKEN = os.getenv("HUGGINGFACE_TOKEN")
 HF_API_URL = "https://api-inference.huggingface.co/models/facebook/nougat-small"
 headers = {"Authorization": f"Bearer {HF_TOKEN}"}
 
+# --- HEDGING CONFIG ---
+# Once the cloud call has been running longer than this percentile of its
+# recent latencies, we start EasyOCR in parallel and keep whichever answers first.
+HEDGE_PERCENTILE = float(os.getenv("OCR_HEDGE_PERCENTILE", "90"))
+HEDGE_DEFAULT_DELAY = 2.0   # seconds, used until we have enough samples
+HEDGE_MIN_SAMPLES = 5
+CLOUD_TIMEOUT = 10
+
+# --- CIRCUIT BREAKER CONFIG ---
+# After this many consecutive cloud failures we stop calling HF for a while
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_COOLDOWN = 60       # seconds before we let one trial request through
+
+# One pooled client per event loop, so uploads reuse the TLS connection to HF
+# (and scripts that call asyncio.run more than once never reuse a dead pool)
+_http_clients = weakref.WeakKeyDictionary()
+
+cloud_latencies = deque(maxlen=50)
+ocr_metrics = {
+    "requests": 0,
+    "cloud_wins": 0,
+    "local_wins": 0,
+    "hedged": 0,
+    "cloud_failures": 0,
+    "breaker_skips": 0,
+    "hedge_losses": 0,
+}
+
+
+class OCRFailed(Exception):
+    """Raised when neither cloud nor local OCR could read the image."""
+
+
+def get_http_client():
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=CLOUD_TIMEOUT,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+        _http_clients[loop] = client
+    return client
+
+
+def get_reader():
+    global reader
+    with _reader_lock:
+        if reader is None:
+            import easyocr
+            reader = easyocr.Reader(['en'], gpu=False)
+    return reader
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after repeated failures, half-open again after a cooldown.
+    In half-open state only one trial request goes to the cloud at a time.
+    """
+
+    def __init__(self, failure_threshold, cooldown):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self):
+        # Called when any cloud call ends (even cancelled), so a probe never stays stuck
+        self.trial_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        # A failed trial request in half-open state re-opens the breaker straight away
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN)
+
+
+def _hedge_delay():
+    """How long we give the cloud before starting local OCR in parallel."""
+    if len(cloud_latencies) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    samples = sorted(cloud_latencies)
+    index = min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE / 100))
+    return samples[index]
+
+
+def _extract_generated_text(result):
+    # Handle different return formats from different HF models
+    if isinstance(result, list) and len(result) > 0:
+        return result[0].get("generated_text", "")
+    elif isinstance(result, dict):
+        return result.get("generated_text", "")
+    return ""
+
+
+async def _cloud_ocr(file_bytes: bytes):
+    start = time.monotonic()
+    try:
+        response = await get_http_client().post(HF_API_URL, headers=headers, content=file_bytes)
+        response.raise_for_status()
+        text = _extract_generated_text(response.json())
+        if not text:
+            raise ValueError("Cloud OCR returned no text")
+    except asyncio.CancelledError:
+        # Local OCR won. The elapsed time is only a lower bound (roughly the hedge
+        # delay itself), so it stays out of the percentile window
+        raise
+    except Exception:
+        ocr_metrics["cloud_failures"] += 1
+        breaker.record_failure()
+        raise
+
+    cloud_latencies.append(time.monotonic() - start)
+    breaker.record_success()
+    return text
+
+
+def _local_ocr(file_bytes: bytes):
+    image = Image.open(io.BytesIO(file_bytes))
+    image_np = np.array(image)
+    results = get_reader().readtext(image_np, detail=0, paragraph=True)
+    return " ".join(results)
+
+
 async def process_handwriting(file_bytes: bytes):
     """
-    Tries Cloud OCR first, falls back to local EasyOCR if Cloud fails.
+    Hedged OCR: starts with Cloud OCR and, once it is slower than usual (or fails),
+    runs local EasyOCR in parallel. The first non-empty result wins.
+    Returns "" if OCR ran but found no text, raises OCRFailed if every path errored.
     """
-    # --- TRY CLOUD OCR (Hugging Face) ---
-    if HF_TOKEN:
+    ocr_metrics["requests"] += 1
+
+    # --- LOCAL ONLY (no token, or breaker is open) ---
+    if not HF_TOKEN or not breaker.allow():
+        if HF_TOKEN:
+            ocr_metrics["breaker_skips"] += 1
         try:
-            # We use a thread to keep the request from blocking the async loop
-            response = await asyncio.to_thread(
-                requests.post, HF_API_URL, headers=headers, data=file_bytes, timeout=10
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                # Handle different return formats from different HF models
-                if isinstance(result, list) and len(result) > 0:
-                    return result[0].get("generated_text", "")
-                elif isinstance(result, dict):
-                    return result.get("generated_text", "")
+            text = await asyncio.to_thread(_local_ocr, file_bytes)
+            ocr_metrics["local_wins"] += 1
+            return text
         except Exception as e:
-            print(f"Cloud OCR failed, switching to fallback: {e}")
+            raise OCRFailed(f"All OCR methods failed: {str(e)}") from e
 
-    # --- FALLBACK: LOCAL EASYOCR ---
-    try:
-        image = Image.open(io.BytesIO(file_bytes))
-        image_np = np.array(image)
-        results = reader.readtext(image_np, detail=0, paragraph=True)
-        return " ".join(results)
-    except Exception as e:
-        return f"All OCR methods failed: {str(e)}"
\ No newline at end of file
+    # --- HEDGED CLOUD + LOCAL ---
+    cloud_task = asyncio.create_task(_cloud_ocr(file_bytes))
+    cloud_task.add_done_callback(lambda _: breaker.release_trial())
+    local_task = None
+    pending = {cloud_task}
+    last_error = None
+
+    done, _ = await asyncio.wait(pending, timeout=_hedge_delay())
+    if not done:
+        ocr_metrics["hedged"] += 1
+        local_task = asyncio.create_task(asyncio.to_thread(_local_ocr, file_bytes))
+        pending.add(local_task)
+
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None and task.result():
+                if task is local_task and cloud_task in pending:
+                    # A cloud call that is still running after local OCR finished is
+                    # past the hedge threshold; a hanging HF must trip the breaker too
+                    ocr_metrics["hedge_losses"] += 1
+                    breaker.record_failure()
+                for other in pending:
+                    other.cancel()
+                ocr_metrics["cloud_wins" if task is cloud_task else "local_wins"] += 1
+                return task.result()
+
+            if task.exception() is None:
+                # Local OCR ran fine but found nothing; keep the old "empty text" behaviour
+                continue
+            last_error = task.exception()
+            if task is cloud_task:
+                print(f"Cloud OCR failed, switching to fallback: {last_error}")
+                if local_task is None:
+                    local_task = asyncio.create_task(asyncio.to_thread(_local_ocr, file_bytes))
+                    pending.add(local_task)
+
+    if last_error is None or (local_task is not None and local_task.exception() is None):
+        return ""
+    raise OCRFailed(f"All OCR methods failed: {str(last_error)}") from last_error
+
+
+def get_ocr_metrics():
+    """Snapshot of which OCR path is winning, for the /ocr-metrics endpoint."""
+    return {
+        **ocr_metrics,
+        "hedge_delay_seconds": round(_hedge_delay(), 3),
+        "cloud_latency_samples": len(cloud_latencies),
+        "breaker_state": breaker.state,
+    }
+
+
+async def close_http_client():
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -1,6 +1,11 @@
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 import os
+from app.utils.single_flight import SingleFlight
+
+# Identical raw texts (e.g. the same handout photographed by a whole class)
+# share one refinement call while it is in flight
+refine_flights = SingleFlight()
 
 def get_llm():
     return ChatGroq(
@@ -10,6 +15,10 @@ def get_llm():
     )
 
 async def refine_ocr_text(raw_text: str):
+    key = " ".join(raw_text.split())
+    return await refine_flights.run(key, lambda: _refine(raw_text))
+
+async def _refine(raw_text: str):
     llm = get_llm()
 
     refine_prompt = ChatPromptTemplate.from_messages([
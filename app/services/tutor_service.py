@@ -129,8 +129,9 @@ import os
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+import asyncio
 from langchain_core.chat_history import InMemoryChatMessageHistory
-from langchain_core.runnables.history import RunnableWithMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
 # #-------------------------------------------------------------------
 # # Environment setup
@@ -195,25 +196,129 @@ prompt = ChatPromptTemplate.from_messages([
 #memory management
 store = {}
 
+# Token-budgeted history: the last few turns are sent verbatim, everything older
+# is folded into a rolling summary so prompt size stays flat in long sessions.
+HISTORY_TOKEN_BUDGET = int(os.getenv("TUTOR_HISTORY_TOKEN_BUDGET", "1500"))
+KEEP_LAST_TURNS = int(os.getenv("TUTOR_KEEP_LAST_TURNS", "4"))
+
+summaries = {}          # session_id -> rolling summary text
+summarized_upto = {}    # session_id -> number of messages already folded into the summary
+summary_tasks = {}      # session_id -> background summarization task
+turn_stats = {}         # session_id -> token usage of the last turn
+
+summary_prompt = ChatPromptTemplate.from_messages([
+    ("system", """You maintain a running summary of a tutoring session.
+Merge the new exchanges into the existing summary. Keep what the learner already understands,
+what they struggled with, and the last open question. Be brief (under 150 words)."""),
+    ("human", "Existing summary:\n{summary}\n\nNew exchanges:\n{transcript}"),
+])
+summary_chain = summary_prompt | llm
+
+
 def get_session_history(session_id: str):
     if session_id not in store:
         store[session_id] = InMemoryChatMessageHistory()
     return store[session_id]
 
+
+def count_tokens(text: str) -> int:
+    # Rough estimate (~4 characters per token), good enough for budgeting
+    return max(1, len(text) // 4)
+
+
+def _verbatim_window(messages):
+    """Index of the first message sent verbatim: the last N turns, trimmed to the budget."""
+    # History is stored as (learner, tutor) pairs, so a window that starts on an
+    # even index never opens with a tutor reply whose question was summarized
+    start = max(0, len(messages) - KEEP_LAST_TURNS * 2)
+    start -= start % 2
+    used = sum(count_tokens(m.content) for m in messages[start:])
+    # Trim whole turns, but always keep at least the latest one, even if it
+    # alone exceeds the budget
+    while used > HISTORY_TOKEN_BUDGET and start < len(messages) - 2:
+        used -= sum(count_tokens(m.content) for m in messages[start:start + 2])
+        start += 2
+    return start
+
+
+def build_chat_history(session_id: str):
+    """Rolling summary (if any) followed by the recent turns kept verbatim."""
+    messages = get_session_history(session_id).messages
+    start = _verbatim_window(messages)
+    chat_history = []
+    if summaries.get(session_id):
+        chat_history.append(SystemMessage(
+            content=f"Summary of the earlier conversation:\n{summaries[session_id]}"
+        ))
+    done = summarized_upto.get(session_id, 0)
+    # Turns that fell out of the window but are not summarized yet are still sent
+    # verbatim, so nothing is lost while the background summary catches up
+    gap = messages[done:start] if done < start else []
+    # Turns already in the summary are never repeated, even if the window start
+    # moves back (e.g. long turns followed by short ones)
+    chat_history.extend(gap + messages[max(start, done):])
+    return chat_history
+
+
+async def _refresh_summary(session_id: str):
+    messages = get_session_history(session_id).messages
+    done = summarized_upto.get(session_id, 0)
+    start = _verbatim_window(messages)
+    if start <= done:
+        return
+
+    transcript = "\n".join(
+        f"{'Learner' if isinstance(m, HumanMessage) else 'Tutor'}: {m.content}"
+        for m in messages[done:start]
+    )
+    try:
+        response = await summary_chain.ainvoke({
+            "summary": summaries.get(session_id, "(none yet)"),
+            "transcript": transcript,
+        })
+        summaries[session_id] = response.content
+        summarized_upto[session_id] = start
+    except Exception as e:
+        print(f"Tutor summary failed for session {session_id}: {e}")
+
+
+def schedule_summary(session_id: str):
+    """Fold old turns into the summary in the background, off the critical path."""
+    running = summary_tasks.get(session_id)
+    if running and not running.done():
+        # The next turn will pick up whatever this one misses
+        return
+    summary_tasks[session_id] = asyncio.create_task(_refresh_summary(session_id))
+
+
 # The Chain
 chain = prompt | llm
-runnable_with_history = RunnableWithMessageHistory(
-    chain,
-    get_session_history,
-    input_messages_key="input",
-    history_messages_key="chat_history",
-)
 
 async def stream_tutor_response(user_input: str, topic: str, community: str, session_id: str):
     """Asynchronous generator that yields text chunks from the AI."""
-    async for chunk in runnable_with_history.astream(
-        {"input": user_input, "topic": topic, "community": community},
-        config={"configurable": {"session_id": session_id}}
-    ):
+    chat_history = build_chat_history(session_id)
+    inputs = {"input": user_input, "topic": topic, "community": community, "chat_history": chat_history}
+
+    prompt_tokens = sum(count_tokens(m.content) for m in prompt.format_messages(**inputs))
+    usage = None
+    answer = []
+
+    async for chunk in chain.astream(inputs):
         if chunk.content:
-            yield chunk.content
\ No newline at end of file
+            answer.append(chunk.content)
+            yield chunk.content
+        if getattr(chunk, "usage_metadata", None):
+            usage = chunk.usage_metadata
+
+    history = get_session_history(session_id)
+    history.add_messages([HumanMessage(content=user_input), AIMessage(content="".join(answer))])
+
+    # Prefer the real count from Groq when the stream reports it
+    turn_stats[session_id] = {
+        "prompt_tokens": usage["input_tokens"] if usage else prompt_tokens,
+        "history_tokens": sum(count_tokens(m.content) for m in chat_history),
+        "history_messages": len(chat_history),
+    }
+    print(f"INFO: Tutor session {session_id} prompt tokens: {turn_stats[session_id]['prompt_tokens']}")
+
+    schedule_summary(session_id)
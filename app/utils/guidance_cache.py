@@ -0,0 +1,107 @@
+import os
+import re
+import time
+import sqlite3
+from contextlib import contextmanager
+
+# Persistent cache of "theory to local practice" guidance, plus a request log
+# (fed by /bridge-guidance and the /ws/bridge tutor sessions) so the
+# pre-warming job knows which (topic, community) pairs are popular.
+CACHE_PATH = "app/db/guidance_cache.sqlite3"
+
+# Cached guidance is served for this long, and the pre-warming job
+# regenerates popular entries once they are older than REFRESH_AFTER
+GUIDANCE_TTL = int(os.getenv("GUIDANCE_TTL_DAYS", "7")) * 24 * 3600
+REFRESH_AFTER = GUIDANCE_TTL // 2
+
+os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+
+
+def normalize(text: str) -> str:
+    """'  Solar  Energy ' and 'solar energy' share one cache entry ('C++' and 'C' do not)."""
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+
+@contextmanager
+def _connect():
+    conn = sqlite3.connect(CACHE_PATH)
+    try:
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _init_db():
+    with _connect() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS guidance (
+                topic_key TEXT, community_key TEXT,
+                topic TEXT, community TEXT,
+                guidance TEXT, created_at REAL,
+                PRIMARY KEY (topic_key, community_key)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS requests (
+                topic_key TEXT, community_key TEXT,
+                topic TEXT, community TEXT,
+                hits INTEGER, last_seen REAL,
+                PRIMARY KEY (topic_key, community_key)
+            )
+        """)
+
+
+_init_db()
+
+
+def get_guidance(topic: str, community: str):
+    """Cached guidance for this pair, or None if missing or older than the TTL."""
+    with _connect() as conn:
+        row = conn.execute(
+            """
+            SELECT guidance FROM guidance
+            WHERE topic_key = ? AND community_key = ? AND created_at >= ?
+            """,
+            (normalize(topic), normalize(community), time.time() - GUIDANCE_TTL),
+        ).fetchone()
+    return row[0] if row else None
+
+
+def save_guidance(topic: str, community: str, guidance: str):
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO guidance VALUES (?, ?, ?, ?, ?, ?)",
+            (normalize(topic), normalize(community), topic, community, guidance, time.time()),
+        )
+
+
+def record_request(topic: str, community: str):
+    with _connect() as conn:
+        conn.execute(
+            """
+            INSERT INTO requests VALUES (?, ?, ?, ?, 1, ?)
+            ON CONFLICT (topic_key, community_key)
+            DO UPDATE SET hits = hits + 1, last_seen = excluded.last_seen
+            """,
+            (normalize(topic), normalize(community), topic, community, time.time()),
+        )
+
+
+def pairs_to_prewarm(limit: int, min_hits: int = 2):
+    """
+    Most requested (topic, community) pairs whose guidance is missing (e.g. only
+    seen in tutor sessions so far) or old enough to be refreshed.
+    """
+    with _connect() as conn:
+        return conn.execute(
+            """
+            SELECT r.topic, r.community FROM requests r
+            LEFT JOIN guidance g
+              ON g.topic_key = r.topic_key AND g.community_key = r.community_key
+            WHERE (g.topic_key IS NULL OR g.created_at < ?) AND r.hits >= ?
+            ORDER BY r.hits DESC, r.last_seen DESC
+            LIMIT ?
+            """,
+            (time.time() - REFRESH_AFTER, min_hits, limit),
+        ).fetchall()
@@ -0,0 +1,116 @@
+import os
+import io
+import json
+import asyncio
+import hashlib
+import pypdfium2 as pdfium
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
+
+# Persistent per-page OCR results, so re-ingesting a scanned PDF is cheap
+OCR_CACHE_DIR = "app/db/ocr_cache"
+# How many pages we OCR at the same time
+OCR_PAGE_WORKERS = int(os.getenv("OCR_PAGE_WORKERS", "4"))
+# Pages with less extracted text than this are treated as scanned images
+MIN_TEXT_CHARS = 20
+# 72 dpi * 2 = 144 dpi, enough for EasyOCR on typical lecture notes
+RENDER_SCALE = 2
+
+os.makedirs(OCR_CACHE_DIR, exist_ok=True)
+
+
+def _file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_path(file_hash, page_index):
+    return os.path.join(OCR_CACHE_DIR, f"{file_hash}_p{page_index}_x{RENDER_SCALE}.json")
+
+
+def _read_cache(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["text"]
+
+
+def _write_cache(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"text": text}, f, ensure_ascii=False)
+
+
+def _render_page(pdf, page_index):
+    """Rasterize one page to PNG bytes for the OCR engine."""
+    image = pdf[page_index].render(scale=RENDER_SCALE).to_pil()
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def _ocr_pages(file_path, page_indexes):
+    # Imported here so PDFs with a text layer never load the OCR stack
+    from app.services.ocr_engine import process_handwriting, OCRFailed
+
+    file_hash = _file_hash(file_path)
+    pdf = pdfium.PdfDocument(file_path)
+    semaphore = asyncio.Semaphore(OCR_PAGE_WORKERS)
+
+    async def ocr_one(page_index):
+        cache_path = _cache_path(file_hash, page_index)
+        cached = _read_cache(cache_path)
+        if cached is not None:
+            return cached
+
+        async with semaphore:
+            # pdfium is not thread-safe, so rendering stays on the loop thread;
+            # the OCR itself runs concurrently (cloud over HTTP, EasyOCR in threads)
+            image_bytes = _render_page(pdf, page_index)
+            try:
+                text = await process_handwriting(image_bytes)
+            except OCRFailed as e:
+                print(f"OCR failed for page {page_index + 1} of {file_path}: {e}")
+                return ""
+
+        # Empty results are not cached, so the next ingestion tries again
+        if text.strip():
+            _write_cache(cache_path, text)
+        return text
+
+    try:
+        return await asyncio.gather(*(ocr_one(i) for i in page_indexes))
+    finally:
+        pdf.close()
+
+
+async def aload_pdf_with_ocr(file_path):
+    """
+    Loads a PDF like PyPDFLoader, but pages without a text layer (scanned notes)
+    are rasterized and run through the OCR engine instead of being indexed empty.
+    Scripts call it with asyncio.run(); inside the app, just await it.
+    """
+    documents = await asyncio.to_thread(PyPDFLoader(file_path).load)
+
+    scanned = [
+        i for i, doc in enumerate(documents)
+        if len(doc.page_content.strip()) < MIN_TEXT_CHARS
+    ]
+    if not scanned:
+        return documents
+
+    print(f"🔎 {len(scanned)} scanned page(s) in {file_path}, running OCR...")
+    page_indexes = [documents[i].metadata.get("page", i) for i in scanned]
+    texts = await _ocr_pages(file_path, page_indexes)
+
+    for doc_index, page_index, text in zip(scanned, page_indexes, texts):
+        documents[doc_index] = Document(
+            page_content=text,
+            metadata={**documents[doc_index].metadata, "page": page_index, "ocr": True},
+        )
+
+    recovered = sum(1 for text in texts if text.strip())
+    print(f"✅ Recovered text from {recovered}/{len(scanned)} scanned page(s).")
+    return [doc for doc in documents if doc.page_content.strip()]
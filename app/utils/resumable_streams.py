@@ -0,0 +1,121 @@
+import time
+import uuid
+import asyncio
+from collections import OrderedDict, deque
+
+# How long a finished (or abandoned) response stays available for resuming
+RESPONSE_TTL = 300           # seconds
+# Ring buffer sizes: last N responses per session, last N chunks per response
+MAX_RESPONSES_PER_SESSION = 4
+MAX_CHUNKS_PER_RESPONSE = 4096
+
+
+class ResumeUnavailable(Exception):
+    """The response expired, was evicted, or the requested chunks fell out of the buffer."""
+
+
+class BufferedResponse:
+    """Sequence-numbered chunks of one streamed answer, fed by a background task."""
+
+    def __init__(self, session_id):
+        self.response_id = uuid.uuid4().hex[:12]
+        self.session_id = session_id
+        self.chunks = deque(maxlen=MAX_CHUNKS_PER_RESPONSE)
+        self.first_seq = 0   # seq of self.chunks[0]
+        self.next_seq = 0    # seq the next chunk will get
+        self.finished = False
+        self.error = None
+        self.metadata = None
+        self.updated_at = time.monotonic()
+        self.changed = asyncio.Condition()
+        self.task = None
+
+    def expired(self, now):
+        return self.finished and now - self.updated_at > RESPONSE_TTL
+
+    async def _append(self, chunk):
+        async with self.changed:
+            if len(self.chunks) == self.chunks.maxlen:
+                self.first_seq += 1
+            self.chunks.append(chunk)
+            self.next_seq += 1
+            self.updated_at = time.monotonic()
+            self.changed.notify_all()
+
+    async def _finish(self, metadata=None, error=None):
+        async with self.changed:
+            self.finished = True
+            self.metadata = metadata
+            self.error = error
+            self.updated_at = time.monotonic()
+            self.changed.notify_all()
+
+    async def follow(self, from_seq=0):
+        """Yields (seq, chunk, caught_up) from from_seq until the response is finished."""
+        seq = from_seq
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: self.next_seq > seq or self.finished)
+                if seq < self.first_seq:
+                    raise ResumeUnavailable(f"chunk {seq} is no longer buffered")
+                pending = list(self.chunks)[seq - self.first_seq:]
+                finished = self.finished
+                head = self.next_seq
+            for chunk in pending:
+                yield seq, chunk, seq == head - 1
+                seq += 1
+            if finished and seq >= head:
+                break
+
+        if self.error is not None:
+            raise self.error
+
+
+class ResponseStore:
+    """Per-session ring buffer of recent responses, so a dropped socket can resume."""
+
+    def __init__(self):
+        self.sessions = {}
+
+    def _purge(self):
+        now = time.monotonic()
+        for session_id in list(self.sessions):
+            responses = self.sessions[session_id]
+            for response_id in [r for r, resp in responses.items() if resp.expired(now)]:
+                del responses[response_id]
+            if not responses:
+                del self.sessions[session_id]
+
+    def start(self, session_id, generator_factory, metadata_factory=None):
+        """
+        Starts the upstream generation in its own task. It keeps filling the
+        buffer even if the client goes away, so a reconnect can pick it up.
+        """
+        self._purge()
+        response = BufferedResponse(session_id)
+        responses = self.sessions.setdefault(session_id, OrderedDict())
+        responses[response.response_id] = response
+        # Evict the oldest finished responses only; one that is still generating
+        # stays until it finishes, even if that briefly exceeds the limit
+        finished = [r for r, resp in responses.items() if resp.finished]
+        while len(responses) > MAX_RESPONSES_PER_SESSION and finished:
+            del responses[finished.pop(0)]
+
+        async def run():
+            try:
+                async for chunk in generator_factory():
+                    await response._append(chunk)
+            except Exception as e:
+                await response._finish(error=e)
+            else:
+                await response._finish(metadata_factory() if metadata_factory else None)
+
+        response.task = asyncio.create_task(run())
+        return response
+
+    def get(self, session_id, response_id):
+        self._purge()
+        response = self.sessions.get(session_id, {}).get(response_id)
+        if response is None:
+            raise ResumeUnavailable(f"response {response_id} is not available")
+        return response
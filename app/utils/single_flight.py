@@ -0,0 +1,81 @@
+import asyncio
+
+
+class _StreamFlight:
+    """One upstream generation and the chunks it produced so far."""
+
+    def __init__(self):
+        self.chunks = []
+        self.finished = False
+        self.error = None
+        self.changed = asyncio.Condition()
+        self.task = None
+
+
+class StreamSingleFlight:
+    """
+    Coalesces identical in-flight streaming calls: the first caller starts the
+    upstream generator, everyone else with the same key subscribes to it.
+    Late joiners first replay what has already been streamed, then follow live.
+    """
+
+    def __init__(self):
+        self.flights = {}
+
+    async def stream(self, key, generator_factory):
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = _StreamFlight()
+            self.flights[key] = flight
+            # The generation runs in its own task, so one socket disconnecting
+            # does not cancel the answer for everyone else
+            flight.task = asyncio.create_task(self._run(key, flight, generator_factory()))
+
+        sent = 0
+        while True:
+            async with flight.changed:
+                await flight.changed.wait_for(
+                    lambda: len(flight.chunks) > sent or flight.finished
+                )
+                new_chunks = flight.chunks[sent:]
+                finished = flight.finished
+            for chunk in new_chunks:
+                yield chunk
+            sent += len(new_chunks)
+            if finished and sent == len(flight.chunks):
+                break
+
+        if flight.error is not None:
+            raise flight.error
+
+    async def _run(self, key, flight, generator):
+        try:
+            async for chunk in generator:
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            # New requests after this point start a fresh generation
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+            async with flight.changed:
+                flight.finished = True
+                flight.changed.notify_all()
+
+
+class SingleFlight:
+    """Same idea for plain coroutines: identical in-flight calls share one result."""
+
+    def __init__(self):
+        self.flights = {}
+
+    async def run(self, key, coroutine_factory):
+        future = self.flights.get(key)
+        if future is None:
+            future = asyncio.ensure_future(coroutine_factory())
+            self.flights[key] = future
+            future.add_done_callback(lambda _: self.flights.pop(key, None))
+        # shield: a cancelled caller must not cancel the shared call
+        return await asyncio.shield(future)
@@ -0,0 +1,61 @@
+import os
+import re
+import json
+import hashlib
+
+# Every subject gets its own Chroma collection (shard) inside the same store,
+# so a query only searches that subject's chunks.
+CHROMA_PATH = "app/db/chroma_expert"
+REGISTRY_PATH = os.path.join(CHROMA_PATH, "subjects.json")
+
+_cache = {"mtime": None, "data": {}}
+
+
+def collection_name_for(subject: str) -> str:
+    """Chroma-safe collection name: readable slug plus a short hash to avoid collisions."""
+    slug = re.sub(r"[^a-z0-9]+", "_", subject.lower()).strip("_")[:40] or "subject"
+    digest = hashlib.sha1(subject.encode("utf-8")).hexdigest()[:8]
+    return f"subject_{slug}_{digest}"
+
+
+def load_registry() -> dict:
+    """Returns {subject: {"collection": ..., "chunks": ...}}, re-read only when the file changes."""
+    if not os.path.exists(REGISTRY_PATH):
+        return {}
+    mtime = os.path.getmtime(REGISTRY_PATH)
+    if mtime != _cache["mtime"]:
+        with open(REGISTRY_PATH, "r", encoding="utf-8") as f:
+            _cache["data"] = json.load(f)
+        _cache["mtime"] = mtime
+    return _cache["data"]
+
+
+def _save_registry(registry: dict):
+    os.makedirs(CHROMA_PATH, exist_ok=True)
+    tmp_path = REGISTRY_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(registry, f, indent=2, ensure_ascii=False)
+    # Atomic swap so the running server never reads a half-written file
+    os.replace(tmp_path, REGISTRY_PATH)
+
+
+def register_subject(subject: str, chunk_count: int):
+    """Called by the ingestion scripts after writing into a shard, with the shard's total size."""
+    registry = dict(load_registry())
+    entry = {"collection": collection_name_for(subject), "chunks": chunk_count}
+    registry[subject] = entry
+    _save_registry(registry)
+    return entry
+
+
+def get_subject_collection(subject: str):
+    """Collection name for a registered subject, or None if it has no shard yet."""
+    entry = load_registry().get(subject)
+    return entry["collection"] if entry else None
+
+
+def list_subjects():
+    return [
+        {"subject": subject, "collection": entry["collection"], "chunks": entry["chunks"]}
+        for subject, entry in sorted(load_registry().items())
+    ]
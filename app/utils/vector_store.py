@@ -1,17 +1,33 @@
 import os
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
+import glob
+import asyncio
+from collections import defaultdict
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
+from app.utils.pdf_ocr import aload_pdf_with_ocr
+from app.utils.subject_registry import CHROMA_PATH, collection_name_for, register_subject, get_subject_collection
 
-# Path to store the database
-CHROMA_PATH = "app/db/chroma_expert"
+# Path to read the notes from. Each sub-folder is a subject,
+# e.g. app/knowledge_base/Operations Research/*.pdf
 DATA_PATH = "app/knowledge_base"
+# Stays below Chroma's max_batch_size (~5k) when copying chunks between collections
+MIGRATION_BATCH_SIZE = 4000
+
+def _subject_for(pdf_path):
+    relative = os.path.relpath(pdf_path, DATA_PATH)
+    parts = relative.split(os.sep)
+    return parts[0] if len(parts) > 1 else None
+
+async def _load_documents():
+    documents_by_subject = defaultdict(list)
+    for pdf_path in sorted(glob.glob(os.path.join(DATA_PATH, "**/*.pdf"), recursive=True)):
+        documents_by_subject[_subject_for(pdf_path)].extend(await aload_pdf_with_ocr(pdf_path))
+    return documents_by_subject
 
 def load_and_index_docs():
-    # 1. Load documents from your folder
-    loader = DirectoryLoader(DATA_PATH, glob="**/*.pdf", loader_cls=PyPDFLoader)
-    documents = loader.load()
+    # 1. Load documents from your folder (scanned pages go through OCR)
+    documents_by_subject = asyncio.run(_load_documents())
 
     # 2. Split text into chunks (perfect for step-by-step logic)
     text_splitter = RecursiveCharacterTextSplitter(
@@ -19,13 +35,76 @@ def load_and_index_docs():
         chunk_overlap=100,
         add_start_index=True,
     )
-    chunks = text_splitter.split_documents(documents)
 
     # 3. Create Embeddings (Turning text into math coordinates)
     embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
 
-    # 4. Save to ChromaDB
-    db = Chroma.from_documents(
-        chunks, embeddings, persist_directory=CHROMA_PATH
-    )
-    print(f"Saved {len(chunks)} chunks to {CHROMA_PATH}")
\ No newline at end of file
+    # 4. Save to ChromaDB, one shard per subject
+    for subject, documents in documents_by_subject.items():
+        chunks = text_splitter.split_documents(documents)
+        if not chunks:
+            continue
+
+        if subject is None:
+            # Loose files without a subject folder go to the default collection
+            Chroma.from_documents(chunks, embeddings, persist_directory=CHROMA_PATH)
+            print(f"Saved {len(chunks)} chunks to {CHROMA_PATH}")
+            continue
+
+        for chunk in chunks:
+            chunk.metadata["subject"] = subject
+        shard = Chroma.from_documents(
+            chunks, embeddings,
+            collection_name=collection_name_for(subject),
+            persist_directory=CHROMA_PATH,
+        )
+        if get_subject_collection(subject) is None:
+            copy_legacy_subject(subject, shard)
+        register_subject(subject, shard._collection.count())
+        print(f"Saved {len(chunks)} chunks for {subject} to {CHROMA_PATH}")
+
+def _upsert_in_batches(shard, group):
+    # Chroma rejects batches above its max_batch_size, so copy in slices
+    for i in range(0, len(group["ids"]), MIGRATION_BATCH_SIZE):
+        shard._collection.upsert(**{key: values[i:i + MIGRATION_BATCH_SIZE] for key, values in group.items()})
+
+def copy_legacy_subject(subject, shard):
+    """
+    Copies one subject's chunks from the old shared collection into its new shard.
+    Must run before the subject is registered: once registered, /ws/expert only
+    searches the shard, and the legacy chunks would silently drop out.
+    """
+    legacy = Chroma(persist_directory=CHROMA_PATH)
+    data = legacy.get(where={"subject": subject}, include=["embeddings", "documents", "metadatas"])
+    if len(data["ids"]):
+        _upsert_in_batches(shard, {key: data[key] for key in ("ids", "embeddings", "documents", "metadatas")})
+        print(f"Copied {len(data['ids'])} existing chunks for {subject} from the shared collection")
+    return len(data["ids"])
+
+def shard_legacy_collection():
+    """
+    One-off migration: copies chunks from the old single collection into
+    per-subject shards, reusing the stored embeddings (no re-embedding).
+    """
+    legacy = Chroma(persist_directory=CHROMA_PATH)
+    data = legacy.get(include=["embeddings", "documents", "metadatas"])
+
+    grouped = defaultdict(lambda: {"ids": [], "embeddings": [], "documents": [], "metadatas": []})
+    for i, metadata in enumerate(data["metadatas"]):
+        subject = (metadata or {}).get("subject")
+        if not subject:
+            continue
+        group = grouped[subject]
+        group["ids"].append(data["ids"][i])
+        group["embeddings"].append(data["embeddings"][i])
+        group["documents"].append(data["documents"][i])
+        group["metadatas"].append(metadata)
+
+    for subject, group in grouped.items():
+        shard = Chroma(collection_name=collection_name_for(subject), persist_directory=CHROMA_PATH)
+        _upsert_in_batches(shard, group)
+        register_subject(subject, shard._collection.count())
+        print(f"Moved {len(group['ids'])} chunks for {subject} into their own shard")
+
+if __name__ == "__main__":
+    shard_legacy_collection()
@@ -0,0 +1,144 @@
+import json
+import struct
+import asyncio
+
+# --- PROTOCOLS ---
+# Clients opt in through the WebSocket subprotocol list, e.g.
+#   new WebSocket(url, ["bridge.compact.v1"])
+# Clients that ask for nothing keep the original JSON text frames.
+# Compression is left to the transport: uvicorn negotiates permessage-deflate
+# with every browser by default, for both protocols.
+# A reference browser decoder lives in test-front-end/compact_frames.js.
+COMPACT = "bridge.compact.v1"
+SUPPORTED_PROTOCOLS = (COMPACT,)
+
+# --- BINARY FRAME LAYOUT ---
+# byte 0: low 4 bits = packet type, 0x40 = metadata present
+# [if metadata] 2 bytes big-endian length + metadata as JSON
+# rest: UTF-8 text payload
+TYPE_CODES = {"content": 0, "done": 1, "error": 2, "status": 3}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+FLAG_METADATA = 0x40
+
+# Compact mode merges small content chunks into one frame until it has this many
+# bytes or this much time has passed, so a response needs far fewer frames.
+COALESCE_BYTES = 64
+COALESCE_SECONDS = 0.1
+
+# JSON clients get every chunk as its own frame, so the endpoint paces them to
+# keep the UI from flickering. Compact batching already smooths the UI, so
+# compact clients get no extra delay.
+JSON_CHUNK_PACING = 0.02
+
+
+def negotiate_protocol(websocket):
+    """Pick the first compact protocol the client offered, or None for JSON."""
+    offered = websocket.scope.get("subprotocols", [])
+    for protocol in offered:
+        if protocol in SUPPORTED_PROTOCOLS:
+            return protocol
+    return None
+
+
+def encode_frame(packet_type, payload="", metadata=None):
+    """Binary frame for one packet."""
+    header = TYPE_CODES[packet_type]
+    body = b""
+    if metadata is not None:
+        header |= FLAG_METADATA
+        meta_bytes = json.dumps(metadata, separators=(",", ":")).encode("utf-8")
+        body += struct.pack(">H", len(meta_bytes)) + meta_bytes
+    body += payload.encode("utf-8")
+    return bytes([header]) + body
+
+
+def decode_frame(frame):
+    """Python reference decoder (mirrors compact_frames.js). Returns a packet dict."""
+    header, body = frame[0], frame[1:]
+    packet = {"type": TYPE_NAMES[header & 0x0F]}
+    if header & FLAG_METADATA:
+        (meta_len,) = struct.unpack(">H", body[:2])
+        packet["metadata"] = json.loads(body[2:2 + meta_len])
+        body = body[2 + meta_len:]
+    packet["payload"] = body.decode("utf-8")
+    return packet
+
+
+class FrameSender:
+    """
+    Sends packets in whatever protocol the client negotiated:
+    JSON text frames by default, compact binary frames on request.
+    Also counts bytes and frames so we can compare both protocols.
+    """
+
+    def __init__(self, websocket, protocol=None):
+        self.websocket = websocket
+        self.protocol = protocol
+        self.chunk_pacing = JSON_CHUNK_PACING if protocol is None else 0
+        self.pending = []
+        self.pending_bytes = 0
+        self.pending_metadata = None
+        self.flush_timer = None
+        # Keeps frames in order when the flush timer and the handler both send
+        self.send_lock = asyncio.Lock()
+        self.bytes_sent = 0
+        self.frames_sent = 0
+
+    async def send(self, packet_type, payload="", metadata=None):
+        if self.protocol is None:
+            # Same packets old clients already expect, e.g. {"type": "done"}
+            packet = {"type": packet_type}
+            if payload or packet_type != "done":
+                packet["payload"] = payload
+            if metadata is not None:
+                packet["metadata"] = metadata
+            text = json.dumps(packet)
+            await self.websocket.send_text(text)
+            self.bytes_sent += len(text.encode("utf-8"))
+            self.frames_sent += 1
+            return
+
+        if packet_type == "content":
+            # A merged frame carries the metadata of its last chunk (e.g. its seq)
+            self.pending.append(payload)
+            self.pending_metadata = metadata
+            self.pending_bytes += len(payload.encode("utf-8"))
+            if self.pending_bytes >= COALESCE_BYTES:
+                await self.flush()
+            elif self.flush_timer is None:
+                # If the model pauses, the batch still goes out after COALESCE_SECONDS
+                self.flush_timer = asyncio.get_running_loop().call_later(
+                    COALESCE_SECONDS, lambda: asyncio.ensure_future(self._timed_flush())
+                )
+            return
+
+        # Any other packet closes the current batch first to keep the order
+        await self.flush()
+        async with self.send_lock:
+            await self._send_binary(encode_frame(packet_type, payload, metadata))
+
+    async def flush(self):
+        async with self.send_lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+            if not self.pending:
+                return
+            text = "".join(self.pending)
+            metadata = self.pending_metadata
+            self.pending = []
+            self.pending_bytes = 0
+            self.pending_metadata = None
+            await self._send_binary(encode_frame("content", text, metadata))
+
+    async def _timed_flush(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            # The socket probably closed; the handler will notice on its next send
+            print(f"Websocket flush failed: {e}")
+
+    async def _send_binary(self, frame):
+        await self.websocket.send_bytes(frame)
+        self.bytes_sent += len(frame)
+        self.frames_sent += 1
@@ -0,0 +1,66 @@
+"""
+Benchmark: query latency of one shared collection + subject filter
+vs. one collection per subject, as the number of subjects grows.
+
+Uses random 384-d vectors (same size as all-MiniLM-L6-v2) so it runs
+without downloading the embedding model:
+
+    python benchmarks/bench_subject_shards.py
+"""
+import time
+import statistics
+import numpy as np
+import chromadb
+
+DIM = 384
+CHUNKS_PER_SUBJECT = 2000
+SUBJECT_COUNTS = [1, 2, 4, 8, 16]
+QUERIES = 50
+K = 4
+
+rng = np.random.default_rng(42)
+
+
+def timed_queries(collection, where=None):
+    timings = []
+    for _ in range(QUERIES):
+        query = rng.random(DIM).tolist()
+        start = time.perf_counter()
+        collection.query(query_embeddings=[query], n_results=K, where=where)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def add_in_batches(collection, ids, embeddings, metadatas, batch=5000):
+    for i in range(0, len(ids), batch):
+        collection.add(
+            ids=ids[i:i + batch],
+            embeddings=embeddings[i:i + batch],
+            metadatas=metadatas[i:i + batch],
+        )
+
+
+def main():
+    print(f"{'subjects':>8} | {'total chunks':>12} | {'shared+filter (ms)':>18} | {'shard (ms)':>10}")
+    for count in SUBJECT_COUNTS:
+        client = chromadb.EphemeralClient()
+        shared = client.create_collection(f"shared_{count}")
+
+        for s in range(count):
+            subject = f"Subject {s}"
+            ids = [f"{s}-{i}" for i in range(CHUNKS_PER_SUBJECT)]
+            embeddings = rng.random((CHUNKS_PER_SUBJECT, DIM)).tolist()
+            metadatas = [{"subject": subject}] * CHUNKS_PER_SUBJECT
+
+            add_in_batches(shared, ids, embeddings, metadatas)
+            shard = client.create_collection(f"shard_{count}_{s}")
+            add_in_batches(shard, ids, embeddings, metadatas)
+
+        target = client.get_collection(f"shard_{count}_0")
+        shared_ms = timed_queries(shared, where={"subject": "Subject 0"})
+        shard_ms = timed_queries(target)
+        print(f"{count:>8} | {count * CHUNKS_PER_SUBJECT:>12} | {shared_ms:>18.2f} | {shard_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark: bytes on the wire and frames per response for the original JSON
+protocol vs. the compact binary protocols in app/utils/ws_framing.py.
+
+Replays a typical tutor answer split into Groq-sized deltas (a few characters
+each) through FrameSender, with the same packets /ws/bridge sends, and adds the WebSocket frame header overhead. Chunks are paced like the
+live endpoint: UPSTREAM_CHUNK_INTERVAL between Groq deltas, plus the endpoint's
+per-chunk pacing for JSON clients (compact clients get none). The baseline row
+replays the packets /ws/bridge sent before resumable streams (no start status,
+no seq, no done metadata):
+
+    python benchmarks/bench_ws_framing.py
+"""
+import re
+import sys
+import zlib
+import asyncio
+
+sys.path.insert(0, ".")
+from app.utils.ws_framing import COMPACT, FrameSender, decode_frame
+
+# Assumed Groq delta rate for llama-3.1-8b-instant (~500 tokens/s)
+UPSTREAM_CHUNK_INTERVAL = 0.002
+
+SAMPLE_ANSWER = r"""Imagine the market woman in Mokolo who sells tomatoes every morning.
+Each day her stock can be **high**, **medium** or **low**, and tomorrow's state only depends on today's.
+That is exactly a Markov chain with state space $S = \{H, M, L\}$.
+
+### Step 1: Transition matrix
+From her records we estimate:
+$$ P = \begin{bmatrix} 0.6 & 0.3 & 0.1 \\ 0.2 & 0.5 & 0.3 \\ 0.1 & 0.4 & 0.5 \end{bmatrix} $$
+Each row sums to $1$ because tomorrow she must be in one of the three states.
+
+### Step 2: Two days ahead
+To know the stock in two days we multiply the matrix by itself: $P^2 = P \times P$.
+For example, from high to low in two days:
+$$ p_{HL}^{(2)} = 0.6 \times 0.1 + 0.3 \times 0.3 + 0.1 \times 0.5 = 0.2 $$
+
+So there is a $20\%$ chance a full basket becomes almost empty in two days, which helps her decide when to buy from the farmers.
+
+**Question: If today her stock is low, what is the probability it is high the day after tomorrow?**
+"""
+
+
+def groq_like_chunks(text):
+    # Groq deltas are roughly one token: a word piece, often with its leading space
+    return re.findall(r"\s*\S{1,6}|\s+", text)
+
+
+def ws_header_size(payload_len):
+    # Server-to-client frames are unmasked: 2 bytes, +2 for >125, +8 for >65535
+    if payload_len <= 125:
+        return 2
+    if payload_len <= 65535:
+        return 4
+    return 10
+
+
+class RecordingSocket:
+    def __init__(self, permessage_deflate=False):
+        self.frames = []
+        self.deflater = zlib.compressobj(wbits=-15) if permessage_deflate else None
+
+    def _record(self, data):
+        if self.deflater is not None:
+            data = self.deflater.compress(data) + self.deflater.flush(zlib.Z_SYNC_FLUSH)
+            data = data[:-4]
+        self.frames.append(data)
+
+    async def send_text(self, text):
+        self._record(text.encode("utf-8"))
+
+    async def send_bytes(self, data):
+        self._record(data)
+
+    def wire_bytes(self):
+        return sum(len(f) + ws_header_size(len(f)) for f in self.frames)
+
+
+async def replay_baseline(permessage_deflate=False):
+    """The original JSON stream: bare content packets and a bare done."""
+    socket = RecordingSocket(permessage_deflate)
+    sender = FrameSender(socket)
+    for chunk in groq_like_chunks(SAMPLE_ANSWER):
+        await sender.send("content", chunk)
+        await asyncio.sleep(UPSTREAM_CHUNK_INTERVAL + sender.chunk_pacing)
+    await sender.send("done")
+    return socket
+
+
+async def replay(protocol, permessage_deflate=False):
+    """Sends the same packets /ws/bridge does: start status, content (seq in compact mode), done."""
+    socket = RecordingSocket(permessage_deflate)
+    sender = FrameSender(socket, protocol)
+    response_id = "3f9a1c2b7d4e"
+    await sender.send("status", "start", metadata={
+        "response_id": response_id,
+        "session_id": "student-42",
+        "seq": 0
+    })
+    for seq, chunk in enumerate(groq_like_chunks(SAMPLE_ANSWER)):
+        await sender.send("content", chunk, metadata={"seq": seq} if protocol else None)
+        await asyncio.sleep(UPSTREAM_CHUNK_INTERVAL + sender.chunk_pacing)
+    await sender.send("done", metadata={
+        "prompt_tokens": 812,
+        "history_tokens": 340,
+        "history_messages": 6,
+        "response_id": response_id
+    })
+    return socket
+
+
+async def main():
+    chunks = groq_like_chunks(SAMPLE_ANSWER)
+    print(f"answer: {len(SAMPLE_ANSWER.encode('utf-8'))} bytes of text in {len(chunks)} chunks\n")
+    print(f"{'protocol':<38} | {'frames':>6} | {'wire bytes':>10}")
+
+    for label, pmd in [("json (baseline)", False), ("json (baseline) + permessage-deflate", True)]:
+        socket = await replay_baseline(pmd)
+        print(f"{label:<38} | {len(socket.frames):>6} | {socket.wire_bytes():>10}")
+
+    cases = [
+        ("json", None, False),
+        ("json + permessage-deflate", None, True),
+        (COMPACT, COMPACT, False),
+        (COMPACT + " + permessage-deflate", COMPACT, True),
+    ]
+    for label, protocol, pmd in cases:
+        socket = await replay(protocol, pmd)
+        print(f"{label:<38} | {len(socket.frames):>6} | {socket.wire_bytes():>10}")
+
+    # Sanity check: the compact frames decode back to the original answer
+    socket = await replay(COMPACT)
+    packets = [decode_frame(frame) for frame in socket.frames]
+    text = "".join(p["payload"] for p in packets if p["type"] == "content")
+    assert text == SAMPLE_ANSWER, "compact frames did not round-trip"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
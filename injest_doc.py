@@ -1,20 +1,22 @@
 import os
-from langchain_community.document_loaders import PyPDFLoader
+import asyncio
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
+from app.utils.pdf_ocr import aload_pdf_with_ocr
+from app.utils.subject_registry import CHROMA_PATH, collection_name_for, register_subject, get_subject_collection
+from app.utils.vector_store import copy_legacy_subject
 
 def upload_and_index_pdf(file_path, subject):
     """
     Processes a PDF and saves it to the ChromaDB with subject metadata.
     """
-    # 1. Load the PDF
+    # 1. Load the PDF (scanned pages go through OCR)
     if not os.path.exists(file_path):
         print(f"Error: File {file_path} not found.")
         return
 
-    loader = PyPDFLoader(file_path)
-    documents = loader.load()
+    documents = asyncio.run(aload_pdf_with_ocr(file_path))
 
     # 2. Split into chunks (Optimized for technical notes)
     text_splitter = RecursiveCharacterTextSplitter(
@@ -27,13 +29,19 @@ def upload_and_index_pdf(file_path, subject):
     for chunk in chunks:
         chunk.metadata["subject"] = subject
 
-    # 4. Embed and store
+    # 4. Embed and store in this subject's own shard
     embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
     vector_db = Chroma.from_documents(
         chunks, 
         embeddings, 
-        persist_directory="app/db/chroma_expert"
+        collection_name=collection_name_for(subject),
+        persist_directory=CHROMA_PATH
     )
+    # First shard for this subject: bring over its chunks from the old shared
+    # collection, otherwise they stop being searched once it is registered
+    if get_subject_collection(subject) is None:
+        copy_legacy_subject(subject, vector_db)
+    register_subject(subject, vector_db._collection.count())
     
     print(f"✅ Successfully indexed {len(chunks)} chunks for {subject}.")
 
@@ -1,19 +1,25 @@
 import json
 import asyncio
 import os
+import uuid
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, File, UploadFile, HTTPException, status, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 
 # Import your custom Pydantic models
-from app.models.schemas import OCRResponse, DownloadRequest
+from app.models.schemas import OCRResponse, DownloadRequest, BridgeRequest, BridgeResponse
 
 # Import your updated services
-from app.services.ocr_engine import process_handwriting
+from app.services.ocr_engine import process_handwriting, get_ocr_metrics, close_http_client
 from app.services.ocr_refiner import refine_ocr_text
-from app.services.tutor_service import stream_tutor_response
+from app.services.tutor_service import stream_tutor_response, turn_stats
 from app.services.expert_service import stream_expert_response
+from app.services.groq_client import get_bridging_guidance, run_prewarm_job, TYPEWRITER_DELAY
+from app.utils.guidance_cache import record_request
 from app.utils.doc_gen import create_docx, create_pdf
+from app.utils.subject_registry import list_subjects
+from app.utils.ws_framing import FrameSender, negotiate_protocol
+from app.utils.resumable_streams import ResponseStore, ResumeUnavailable
 
 app = FastAPI(title="AI-Powered Learning Bridge")
 
@@ -27,14 +33,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Recent tutor responses per session, so a dropped socket can resume mid-answer
+bridge_responses = ResponseStore()
+
+# Tutor topics tell the guidance pre-warming job what students ask about.
+# The defaults the endpoint fills in for missing fields are not real requests.
+DEFAULT_TOPIC = "General"
+DEFAULT_COMMUNITY = "Cameroon"
+# Keeps fire-and-forget request-log writes alive until they finish
+pending_request_logs = set()
+
+async def _log_tutor_topic(topic, community):
+    try:
+        await asyncio.to_thread(record_request, topic, community)
+    except Exception as e:
+        print(f"Could not record tutor topic {topic!r}: {e}")
+
 # --- WEBSOCKET TUTOR ENDPOINT ---
 @app.websocket("/ws/bridge")
 async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
+    # Low-bandwidth clients can ask for compact binary frames at connect time
+    protocol = negotiate_protocol(websocket)
+    await websocket.accept(subprotocol=protocol)
+    sender = FrameSender(websocket, protocol)
     
     # Initialize session variables immediately to prevent UnboundLocalError
     # during unexpected disconnections
     session_id = "initialization"
+    # Clients without a session_id get their own server-issued one (announced in
+    # the "start" packet), so they never share resume buffers with each other
+    anonymous_id = f"anonymous-{uuid.uuid4().hex[:12]}"
+    # (session_id, topic, community) already counted on this connection
+    logged_topics = set()
     
     try:
         while True:
@@ -43,24 +73,62 @@ async def websocket_endpoint(websocket: WebSocket):
             payload = json.loads(raw_data)
             
             user_message = payload.get("message")
-            session_id = payload.get("session_id", "anonymous")
-            topic = payload.get("topic", "General")
-            community = payload.get("community", "Cameroon")
-
-            # Stream response from Groq LLM
-            async for text_chunk in stream_tutor_response(
-                user_message, topic, community, session_id
-            ):
-                await websocket.send_text(json.dumps({
-                    "type": "content",
-                    "payload": text_chunk
-                }))
-                # Smooth pacing prevents the UI from flickering 
-                # during high-speed text generation
-                await asyncio.sleep(0.02)
+            session_id = payload.get("session_id") or anonymous_id
+            topic = payload.get("topic") or DEFAULT_TOPIC
+            community = payload.get("community") or DEFAULT_COMMUNITY
+
+            if payload.get("resume"):
+                # Reconnected client: {"session_id", "resume": <response_id>, "last_seq": <n>}
+                try:
+                    response = bridge_responses.get(session_id, payload["resume"])
+                    from_seq = int(payload.get("last_seq", -1)) + 1
+                except (ResumeUnavailable, TypeError, ValueError) as e:
+                    await sender.send("error", f"Cannot resume: {e}", metadata={"resume_failed": payload["resume"]})
+                    continue
+            else:
+                # Count each topic once per session, off the critical path
+                topic_key = (session_id, topic, community)
+                if topic != DEFAULT_TOPIC and topic_key not in logged_topics:
+                    logged_topics.add(topic_key)
+                    task = asyncio.create_task(_log_tutor_topic(topic, community))
+                    pending_request_logs.add(task)
+                    task.add_done_callback(pending_request_logs.discard)
+
+                # Stream response from Groq LLM. The generation runs in the background and
+                # keeps filling the buffer even if this socket drops.
+                response = bridge_responses.start(
+                    session_id,
+                    lambda: stream_tutor_response(user_message, topic, community, session_id),
+                    # metadata carries the prompt token count so we can watch it flatten
+                    lambda: turn_stats.get(session_id),
+                )
+                from_seq = 0
+
+            await sender.send("status", "start", metadata={
+                "response_id": response.response_id,
+                "session_id": session_id,
+                "seq": from_seq
+            })
+
+            try:
+                async for seq, text_chunk, caught_up in response.follow(from_seq):
+                    # JSON clients count content packets from the "start" seq; compact
+                    # frames merge chunks, so each carries the seq of its last chunk
+                    await sender.send("content", text_chunk, metadata={"seq": seq} if sender.protocol else None)
+                    # Smooth pacing prevents the UI from flickering 
+                    # during high-speed text generation (replayed chunks go out at once,
+                    # and compact clients are smoothed by batching instead)
+                    if caught_up and sender.chunk_pacing:
+                        await asyncio.sleep(sender.chunk_pacing)
+            except ResumeUnavailable as e:
+                await sender.send("error", str(e), metadata={"resume_failed": response.response_id})
+                continue
 
             # Signal that the AI has finished its current turn
-            await websocket.send_text(json.dumps({"type": "done"}))
+            await sender.send("done", metadata={
+                **(response.metadata or {}),
+                "response_id": response.response_id
+            })
 
     except WebSocketDisconnect:
         # Handles Code 1001 (browser refresh) or 1000 (tab close)
@@ -70,10 +138,7 @@ async def websocket_endpoint(websocket: WebSocket):
         print(f"ERROR: WebSocket crash in session {session_id}: {str(e)}")
         try:
             # Attempt to notify frontend if the connection is still alive
-            await websocket.send_text(json.dumps({
-                "type": "error", 
-                "payload": "The learning bridge encountered a temporary glitch."
-            }))
+            await sender.send("error", "The learning bridge encountered a temporary glitch.")
         except:
             pass
 
@@ -144,6 +209,45 @@ async def digitize_notes(
             detail=f"OCR Refinement failed: {str(e)}"
         )
 
+# --- OCR METRICS ENDPOINT ---
+@app.get("/ocr-metrics")
+async def ocr_metrics():
+    """Shows which OCR path (cloud or local) is winning and the circuit breaker state."""
+    return get_ocr_metrics()
+
+# --- BRIDGING GUIDANCE ENDPOINT ---
+@app.post("/bridge-guidance", response_model=BridgeResponse)
+async def bridge_guidance(req: BridgeRequest):
+    """Theory-to-practice guidance, served from the cache when this pair was asked before."""
+    try:
+        guidance, cached = await get_bridging_guidance(req.topic, req.community)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return BridgeResponse(
+        topic=req.topic,
+        community=req.community,
+        ai_guidance=guidance,
+        cached=cached,
+        # The whole answer arrives at once; clients that want the typewriter effect
+        # can replay it at this pace
+        pacing_ms=int(TYPEWRITER_DELAY * 1000),
+    )
+
+# --- BACKGROUND JOBS ---
+background_tasks = []
+
+@app.on_event("startup")
+async def start_background_jobs():
+    # Keeps the guidance cache warm for the most popular topic/community pairs
+    background_tasks.append(asyncio.create_task(run_prewarm_job()))
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    for task in background_tasks:
+        task.cancel()
+    await close_http_client()
+
 # --- DOWNLOAD ENDPOINT ---
 @app.post("/download-notes")
 async def download_notes(req: DownloadRequest):
@@ -162,10 +266,18 @@ async def download_notes(req: DownloadRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- SUBJECT LISTING ENDPOINT ---
+@app.get("/subjects")
+async def subjects():
+    """Subjects the expert agent can answer on, with the number of indexed chunks."""
+    return {"subjects": list_subjects()}
+
 # --- EXPERT AGENT ENDPOINT ---
 @app.websocket("/ws/expert")
 async def expert_websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
+    protocol = negotiate_protocol(websocket)
+    await websocket.accept(subprotocol=protocol)
+    sender = FrameSender(websocket, protocol)
     try:
         while True:
             raw_data = await websocket.receive_text()
@@ -181,19 +293,14 @@ async def expert_websocket_endpoint(websocket: WebSocket):
             # Stream chunks from your RAG service
             async for text_chunk in stream_expert_response(user_message, subject):
                 # We send as "content" type for the frontend to append
-                await websocket.send_text(json.dumps({
-                    "type": "content",
-                    "payload": text_chunk
-                }))
+                await sender.send("content", text_chunk)
             
             # Critical: Signal the frontend that the stream is finished
-            await websocket.send_text(json.dumps({"type": "done"}))
+            await sender.send("done")
             
     except WebSocketDisconnect:
         print(f"Expert session disconnected for subject: {subject}")
     except Exception as e:
         print(f"Server Error: {e}")
-        await websocket.send_text(json.dumps({
-            "type": "content", 
-            "payload": "\n\n**Error:** The bridge connection was interrupted."
-        }))
\ No newline at end of file
+        await sender.send("content", "\n\n**Error:** The bridge connection was interrupted.")
+        await sender.flush()
\ No newline at end of file
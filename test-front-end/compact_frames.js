@@ -0,0 +1,36 @@
+// Reference decoder for the "bridge.compact.v1" websocket protocol
+// (see app/utils/ws_framing.py for the server side).
+//
+// Frame layout (binary):
+//   byte 0      low 4 bits = packet type, 0x40 = metadata present
+//   [metadata]  2 bytes big-endian length + metadata as UTF-8 JSON
+//   rest        UTF-8 text payload
+//
+// Usage:
+//   const ws = new WebSocket(url, ["bridge.compact.v1"]);
+//   ws.binaryType = "arraybuffer";
+//   ws.onmessage = (event) => {
+//       const data = typeof event.data === "string" ? JSON.parse(event.data) : decodeCompactFrame(event.data);
+//       ...
+//   };
+
+const COMPACT_PROTOCOL = "bridge.compact.v1";
+const COMPACT_TYPE_NAMES = ["content", "done", "error", "status"];
+const COMPACT_FLAG_METADATA = 0x40;
+const compactTextDecoder = new TextDecoder("utf-8");
+
+function decodeCompactFrame(buffer) {
+    const bytes = new Uint8Array(buffer);
+    const header = bytes[0];
+    const packet = { type: COMPACT_TYPE_NAMES[header & 0x0f] };
+    let offset = 1;
+
+    if (header & COMPACT_FLAG_METADATA) {
+        const metaLength = (bytes[1] << 8) | bytes[2];
+        packet.metadata = JSON.parse(compactTextDecoder.decode(bytes.subarray(3, 3 + metaLength)));
+        offset = 3 + metaLength;
+    }
+
+    packet.payload = compactTextDecoder.decode(bytes.subarray(offset));
+    return packet;
+}